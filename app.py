@@ -1,11 +1,25 @@
 #!/usr/bin/env python3
 import os
+import csv
+import hmac
+import io
+import json
+import mimetypes
+import operator
+import re
+import secrets
+import time
 from datetime import datetime, date, timedelta
 from functools import wraps
-from collections import defaultdict, OrderedDict
+from itertools import accumulate, islice
+from collections import defaultdict, namedtuple
+from concurrent.futures import ThreadPoolExecutor
 
-from flask import Flask, render_template_string, request, redirect, url_for, flash, session, abort
+from flask import (Flask, request, redirect, url_for, flash, session, abort, g, jsonify,
+                   render_template, send_from_directory, stream_template, get_flashed_messages)
 from flask_sqlalchemy import SQLAlchemy
+from sqlalchemy import event, inspect
+from jinja2 import DictLoader
 from werkzeug.security import generate_password_hash, check_password_hash
 
 # ----------------------------------------------------------------------------
@@ -24,8 +38,48 @@ app.config["SQLALCHEMY_BINDS"] = {
     "stock": STOCK_DB_URL,
 }
 app.config["SQLALCHEMY_TRACK_MODIFICATIONS"] = False
+app.config["SQLALCHEMY_ECHO"] = False
+# Templates are module strings, loaded once: never stat/recompile them per request
+app.config["TEMPLATES_AUTO_RELOAD"] = False
+
+# Front-end libraries: served from static/vendor once "flask vendor-assets" has mirrored them, else from the CDN
+VENDOR_DIR = os.path.join(app.static_folder, "vendor")
+VENDOR_ASSETS = {
+    "bootstrap-5.3.3.min.css": "https://cdn.jsdelivr.net/npm/bootstrap@5.3.3/dist/css/bootstrap.min.css",
+    "chart-4.4.1.umd.min.js": "https://cdn.jsdelivr.net/npm/chart.js@4.4.1/dist/chart.umd.min.js",
+}
+
+# Pinned KDF parameters (werkzeug "method" string) so hashing cost does not drift with library upgrades
+PASSWORD_HASH_METHOD = os.environ.get("PASSWORD_HASH_METHOD", "scrypt:32768:8:1")
+# Password hashing for bulk imports: hashlib's scrypt/pbkdf2 release the GIL, so hashes run in parallel
+_HASH_POOL = ThreadPoolExecutor(max_workers=4)
+
+# Seconds a logged-in user's id/username/role is trusted from the session before re-reading the users DB
+USER_SESSION_TTL = int(os.environ.get("USER_SESSION_TTL", "60"))
+# Lifetime (seconds) of the per-process users dropdown / username caches
+USER_CACHE_TTL = int(os.environ.get("USER_CACHE_TTL", "60"))
+
+# Views redirect right after committing: don't expire (and later re-SELECT) the objects they touched
+db = SQLAlchemy(app, session_options={"expire_on_commit": False})
+
+SQLITE_PRAGMAS = (
+    "PRAGMA journal_mode=WAL",      # readers are not blocked while a movement is written
+    "PRAGMA synchronous=NORMAL",    # safe with WAL, one fsync per checkpoint instead of per commit
+    "PRAGMA temp_store=MEMORY",
+    "PRAGMA mmap_size=268435456",   # 256 MiB
+    "PRAGMA cache_size=-65536",     # 64 MiB page cache per connection
+)
+
+def _apply_sqlite_pragmas(dbapi_conn, _record):
+    cur = dbapi_conn.cursor()
+    for pragma in SQLITE_PRAGMAS:
+        cur.execute(pragma)
+    cur.close()
 
-db = SQLAlchemy(app)
+with app.app_context():
+    for _engine in set(db.engines.values()):
+        if _engine.dialect.name == "sqlite":
+            event.listen(_engine, "connect", _apply_sqlite_pragmas)
 
 # ----------------------------------------------------------------------------
 # Models
@@ -39,7 +93,7 @@ class User(db.Model):
     is_active = db.Column(db.Boolean, default=True, nullable=False)
 
     def set_password(self, password: str):
-        self.password_hash = generate_password_hash(password)
+        self.password_hash = generate_password_hash(password, method=PASSWORD_HASH_METHOD)
 
     def check_password(self, password: str) -> bool:
         return check_password_hash(self.password_hash, password)
@@ -47,35 +101,205 @@ class User(db.Model):
 class Item(db.Model):
     __bind_key__ = "stock"
     id = db.Column(db.Integer, primary_key=True)
-    finis_code = db.Column(db.String(64), nullable=False, index=True)
+    finis_code = db.Column(db.String(64), nullable=False)
     full_code = db.Column(db.String(128), nullable=False, index=True)
     description = db.Column(db.Text, nullable=False)
     quantity = db.Column(db.Integer, nullable=False, default=0)
 
     created_at = db.Column(db.DateTime, default=datetime.utcnow, index=True)
-    updated_at = db.Column(db.DateTime, default=datetime.utcnow, onupdate=datetime.utcnow, index=True)
+    updated_at = db.Column(db.DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)
 
     created_by_id = db.Column(db.Integer, nullable=False, index=True)
     updated_by_id = db.Column(db.Integer, nullable=True, index=True)
 
+    __table_args__ = (
+        # dashboard: own items (non-admin) / all items (admin), newest first
+        db.Index("ix_item_creator_updated", "created_by_id", "updated_at"),
+        db.Index("ix_item_updated_at_desc", updated_at.desc()),
+        # stock lookup / rollup rebuild: group by (finis, owner)
+        db.Index("ix_item_finis_user", "finis_code", "created_by_id"),
+    )
+
 class Movement(db.Model):
     __bind_key__ = "stock"
     id = db.Column(db.Integer, primary_key=True)
-    item_id = db.Column(db.Integer, db.ForeignKey("item.id"), nullable=False, index=True)
+    item_id = db.Column(db.Integer, db.ForeignKey("item.id"), nullable=False)
     direction = db.Column(db.String(3), nullable=False)  # 'IN' or 'OUT'
     qty = db.Column(db.Integer, nullable=False)  # positive integer
     when = db.Column(db.DateTime, default=datetime.utcnow, nullable=False, index=True)
     note = db.Column(db.Text, nullable=True)
     user_id = db.Column(db.Integer, nullable=False, index=True)  # who recorded it
+    # Copied from the item so stats read this table alone; NULL once the item is deleted
+    finis_code = db.Column(db.String(64), nullable=True, index=True)
+    full_code = db.Column(db.String(128), nullable=True, index=True)
+
+    __table_args__ = (
+        # per-item history and the code propagation on edit/delete
+        db.Index("ix_movement_item_when", "item_id", "when"),
+        # stats filtered by user, in date order
+        db.Index("ix_movement_user_when", "user_id", "when"),
+    )
+
+class StockRollup(db.Model):
+    """Item.quantity summed per (finis_code, owner); see the Item events below."""
+    __bind_key__ = "stock"
+    finis_code = db.Column(db.String(64), primary_key=True)
+    user_id = db.Column(db.Integer, primary_key=True)  # Item.created_by_id
+    qty = db.Column(db.Integer, nullable=False, default=0)
+    item_count = db.Column(db.Integer, nullable=False, default=0)  # 0 = no items left in the group
+
+class MovementDailyStats(db.Model):
+    """Movement.qty summed per (finis_code, recorder, day); /admin/stats reads this table."""
+    __bind_key__ = "stock"
+    __tablename__ = "movement_daily_stats"
+    finis_code = db.Column(db.String(64), primary_key=True)
+    user_id = db.Column(db.Integer, primary_key=True)  # Movement.user_id
+    day = db.Column(db.Date, primary_key=True, index=True)
+    qty_in = db.Column(db.Integer, nullable=False, default=0)
+    qty_out = db.Column(db.Integer, nullable=False, default=0)
+
+# ----------------------------------------------------------------------------
+# Stock rollup maintenance (incremental, inside the same flush as the Item change)
+# ----------------------------------------------------------------------------
+def _rollup_add(conn, finis_code, user_id, qty_delta, count_delta=0):
+    if not qty_delta and not count_delta:
+        return
+    t = StockRollup.__table__
+    res = conn.execute(
+        t.update()
+        .where(t.c.finis_code == finis_code, t.c.user_id == user_id)
+        .values(qty=t.c.qty + qty_delta, item_count=t.c.item_count + count_delta)
+    )
+    if res.rowcount == 0:
+        conn.execute(t.insert().values(finis_code=finis_code, user_id=user_id, qty=qty_delta, item_count=count_delta))
+
+@event.listens_for(Item, "after_insert")
+def _rollup_item_inserted(mapper, conn, item):
+    _rollup_add(conn, item.finis_code, item.created_by_id, item.quantity or 0, 1)
+
+@event.listens_for(Item, "after_delete")
+def _rollup_item_deleted(mapper, conn, item):
+    _rollup_add(conn, item.finis_code, item.created_by_id, -(item.quantity or 0), -1)
+
+@event.listens_for(Item, "after_update")
+def _rollup_item_updated(mapper, conn, item):
+    attrs = inspect(item).attrs
+    finis_hist, qty_hist = attrs.finis_code.history, attrs.quantity.history
+    if not finis_hist.has_changes() and not qty_hist.has_changes():
+        return
+    old_finis = finis_hist.deleted[0] if finis_hist.deleted else item.finis_code
+    old_qty = qty_hist.deleted[0] if qty_hist.deleted else item.quantity
+    if old_finis == item.finis_code:
+        _rollup_add(conn, item.finis_code, item.created_by_id, (item.quantity or 0) - (old_qty or 0))
+    else:
+        _rollup_add(conn, old_finis, item.created_by_id, -(old_qty or 0), -1)
+        _rollup_add(conn, item.finis_code, item.created_by_id, item.quantity or 0, 1)
+
+def refresh_stock_rollup():
+    """Rebuild stock_rollup from scratch (recovery / first run on an existing DB)."""
+    t = StockRollup.__table__
+    with db.engines["stock"].begin() as conn:
+        conn.execute(t.delete())
+        conn.execute(t.insert().from_select(
+            ["finis_code", "user_id", "qty", "item_count"],
+            db.select(Item.finis_code, Item.created_by_id, db.func.sum(Item.quantity), db.func.count())
+            .group_by(Item.finis_code, Item.created_by_id),
+        ))
+
+def _daily_stats_add(conn, finis_code, user_id, day, qty_in, qty_out):
+    t = MovementDailyStats.__table__
+    res = conn.execute(
+        t.update()
+        .where(t.c.finis_code == finis_code, t.c.user_id == user_id, t.c.day == day)
+        .values(qty_in=t.c.qty_in + qty_in, qty_out=t.c.qty_out + qty_out)
+    )
+    if res.rowcount == 0:
+        conn.execute(t.insert().values(finis_code=finis_code, user_id=user_id, day=day, qty_in=qty_in, qty_out=qty_out))
+
+def record_daily_stats(rows):
+    """Add new movements (dicts with finis_code, user_id, when, direction, qty) to movement_daily_stats.
+
+    Called next to every movement insert, in the same transaction; rows are summed
+    per day first so a bulk import costs one statement pair per day, not per row.
+    """
+    sums = defaultdict(lambda: [0, 0])
+    for r in rows:
+        s = sums[(r["finis_code"], r["user_id"], r["when"].date())]
+        s[0 if r["direction"] == "IN" else 1] += r["qty"]
+    conn = db.session.connection(bind_arguments={"mapper": inspect(MovementDailyStats)})
+    for (finis_code, user_id, day), (qty_in, qty_out) in sums.items():
+        _daily_stats_add(conn, finis_code, user_id, day, qty_in, qty_out)
+
+def refresh_movement_daily_stats(conn=None, finis_codes=None):
+    """Rebuild movement_daily_stats from movement, entirely or only for *finis_codes*.
+
+    Without *conn* it runs in its own transaction (first run / CLI); item renames and
+    deletes pass the session connection to recompute the affected codes in place.
+    """
+    t = MovementDailyStats.__table__
+    day = db.func.date(Movement.when)
+    select = (
+        db.select(
+            Movement.finis_code, Movement.user_id, day,
+            db.func.sum(db.case((Movement.direction == "IN", Movement.qty), else_=0)),
+            db.func.sum(db.case((Movement.direction == "OUT", Movement.qty), else_=0)),
+        )
+        .where(Movement.finis_code.isnot(None))
+        .group_by(Movement.finis_code, Movement.user_id, day)
+    )
+    delete = t.delete()
+    if finis_codes is not None:
+        select = select.where(Movement.finis_code.in_(finis_codes))
+        delete = delete.where(t.c.finis_code.in_(finis_codes))
+
+    def rebuild(c):
+        c.execute(delete)
+        c.execute(t.insert().from_select(["finis_code", "user_id", "day", "qty_in", "qty_out"], select))
+
+    if conn is not None:
+        rebuild(conn)
+    else:
+        with db.engines["stock"].begin() as c:
+            rebuild(c)
+
+@app.cli.command("refresh-rollup")
+def refresh_rollup_command():
+    """Rebuild the stock_rollup and movement_daily_stats tables."""
+    refresh_stock_rollup()
+    print("[ROLLUP] stock_rollup ricostruita.")
+    refresh_movement_daily_stats()
+    print("[ROLLUP] movement_daily_stats ricostruita.")
 
 # ----------------------------------------------------------------------------
 # Helpers
 # ----------------------------------------------------------------------------
-def current_user():
+# Snapshot of the logged-in user kept in the (signed) session cookie
+SessionUser = namedtuple("SessionUser", "id username role is_active")
+
+def remember_user(u):
+    session["user_id"] = u.id
+    session["user_snapshot"] = [u.id, u.username, u.role, u.is_active, int(time.time())]
+    g.user = SessionUser(u.id, u.username, u.role, u.is_active)
+    return g.user
+
+def _load_current_user():
     uid = session.get("user_id")
     if not uid:
         return None
-    return db.session.get(User, uid)
+    snap = session.get("user_snapshot")
+    if snap and snap[0] == uid and time.time() - snap[-1] < USER_SESSION_TTL:
+        return SessionUser(*snap[:-1])
+    u = db.session.get(User, uid)
+    if not u:
+        session.pop("user_snapshot", None)
+        return None
+    return remember_user(u)
+
+def current_user():
+    """The logged-in user, resolved once per request (decorators, views and templates share it)."""
+    if "user" not in g:
+        g.user = _load_current_user()
+    return g.user
 
 def login_required(f):
     @wraps(f)
@@ -94,14 +318,134 @@ def admin_required(f):
         return f(*args, **kwargs)
     return wrapper
 
+def csrf_token():
+    """Per-session token for the POST forms that change several rows at once."""
+    if "csrf_token" not in session:
+        session["csrf_token"] = secrets.token_urlsafe(32)
+    return session["csrf_token"]
+
+def check_csrf():
+    expected = session.get("csrf_token")
+    # no token in the session means no form was ever rendered for it: reject, don't compare "" == ""
+    if not expected or not hmac.compare_digest(request.form.get("csrf_token", ""), expected):
+        abort(400)
+
+# user_id -> username (None if the user no longer exists), shared by every request of this
+# process. Only (id, username) is ever selected, never the whole User row.
+USERNAME_CACHE_SIZE = 2048
+_USERNAME_CACHE = {}
+_USERNAME_CACHE_STATS = {"hits": 0, "misses": 0}
+
+def prefetch_usernames(user_ids):
+    """Resolve the usernames of *user_ids* that are not cached yet with one query."""
+    _expire_user_caches()
+    wanted = {uid for uid in user_ids if uid}
+    missing = wanted - _USERNAME_CACHE.keys()
+    _USERNAME_CACHE_STATS["hits"] += len(wanted) - len(missing)
+    _USERNAME_CACHE_STATS["misses"] += len(missing)
+    if not missing:
+        return
+    if len(_USERNAME_CACHE) + len(missing) > USERNAME_CACHE_SIZE:
+        _USERNAME_CACHE.clear()
+    rows = db.session.execute(db.select(User.id, User.username).where(User.id.in_(missing)))
+    found = dict(rows.all())
+    for uid in missing:
+        _USERNAME_CACHE[uid] = found.get(uid)
+
+def iter_prefetching_usernames(rows, attrs, batch=100):
+    """Yield *rows* lazily, resolving the usernames of each batch (via *attrs*) with one query."""
+    it = iter(rows)
+    while chunk := list(islice(it, batch)):
+        prefetch_usernames({getattr(r, a) for r in chunk for a in attrs})
+        yield from chunk
+
 def username_of(user_id: int) -> str:
     if not user_id:
         return ""
-    u = db.session.get(User, user_id)
-    return u.username if u else f"utente#{user_id}"
-
-def can_edit(item, user):
-    return user.role == "admin" or item.created_by_id == user.id
+    if user_id not in _USERNAME_CACHE:
+        prefetch_usernames([user_id])
+    return _USERNAME_CACHE.get(user_id) or f"utente#{user_id}"
+
+# Users dropdown for the admin filters; rebuilt lazily after any user mutation.
+_USERS_LIST_CACHE = {"data": None}
+_USER_CACHES_FILLED_AT = {"at": time.monotonic()}
+
+def get_users_list():
+    _expire_user_caches()
+    if _USERS_LIST_CACHE["data"] is None:
+        _USERS_LIST_CACHE["data"] = [(u.id, u.username, u.role) for u in User.query.order_by(User.username).all()]
+    return _USERS_LIST_CACHE["data"]
+
+def invalidate_user_caches():
+    _USERS_LIST_CACHE["data"] = None
+    _USERNAME_CACHE.clear()
+    _USER_CACHES_FILLED_AT["at"] = time.monotonic()
+
+def _expire_user_caches():
+    # invalidate_user_caches() only reaches this worker: other processes pick up
+    # user changes once their copy is older than USER_CACHE_TTL
+    if time.monotonic() - _USER_CACHES_FILLED_AT["at"] > USER_CACHE_TTL:
+        invalidate_user_caches()
+
+SEARCH_MIN_LEN = 3
+_LIKE_SPECIAL = re.compile(r"([\\%_])")
+
+def escape_like(term):
+    """Escape LIKE wildcards so *term* matches literally (use with escape="\\")."""
+    return _LIKE_SPECIAL.sub(r"\\\1", term)
+
+def item_search_clause(term, columns=("finis_code", "full_code", "description")):
+    """Filter for items whose *columns* contain *term*, case-insensitively.
+
+    Uses the item_fts trigram index when it exists (any substring of 3+ chars is an
+    index lookup); otherwise, or for shorter terms, falls back to a case-insensitive
+    LIKE '%term%' (plain LIKE on SQLite, ILIKE elsewhere).
+    """
+    if ITEM_FTS_ENABLED and len(term) >= SEARCH_MIN_LEN:
+        match = '{%s} : "%s"' % (" ".join(columns), term.replace('"', '""'))
+        ids = db.select(db.literal_column("rowid")).select_from(db.table("item_fts")).where(
+            db.literal_column("item_fts").op("MATCH")(match))
+        return Item.id.in_(ids)
+    like = f"%{escape_like(term)}%"
+    if db.engines["stock"].dialect.name == "sqlite":
+        # SQLite's LIKE is already case-insensitive (ASCII, like its lower()): skip ILIKE's lower() per row
+        return db.or_(*(getattr(Item, c).like(like, escape="\\") for c in columns))
+    return db.or_(*(getattr(Item, c).ilike(like, escape="\\") for c in columns))
+
+def get_editable_item(item_id, user):
+    """Load an item *user* may modify; the ownership check is part of the query (404/403 otherwise)."""
+    stmt = db.select(Item).where(Item.id == item_id)
+    if user.role != "admin":
+        stmt = stmt.where(Item.created_by_id == user.id)
+    item = db.session.execute(stmt).scalar_one_or_none()
+    if item is None:
+        exists = db.session.execute(db.select(Item.id).where(Item.id == item_id)).first()
+        abort(403 if exists else 404)
+    return item
+
+def apply_quantity_delta(item, delta, user_id):
+    """Add *delta* to item.quantity with a single UPDATE (floored at 0); returns the new quantity.
+
+    Core UPDATEs bypass the Item mapper events, so the rollup is adjusted here, by the
+    change actually applied to the row: its current quantity is re-read under a row lock
+    (FOR UPDATE; SQLite already holds the write lock from the movement insert) rather than
+    taken from *item*, which may be stale if another movement committed meanwhile.
+    """
+    old_qty = db.session.execute(
+        db.select(Item.quantity).where(Item.id == item.id).with_for_update()
+    ).scalar_one()
+    new_qty = Item.quantity + delta
+    stmt = (
+        db.update(Item)
+        .where(Item.id == item.id)
+        .values(quantity=db.case((new_qty < 0, 0), else_=new_qty), updated_by_id=user_id)
+        .returning(Item.quantity)
+        .execution_options(synchronize_session=False)
+    )
+    quantity = db.session.execute(stmt).scalar_one()
+    conn = db.session.connection(bind_arguments={"mapper": inspect(Item)})
+    _rollup_add(conn, item.finis_code, item.created_by_id, quantity - old_qty)
+    return quantity
 
 # ----------------------------------------------------------------------------
 # Templates
@@ -113,8 +457,10 @@ layout = """
     <meta charset="utf-8">
     <meta name="viewport" content="width=device-width, initial-scale=1">
     <title>Stock App</title>
-    <link href="https://cdn.jsdelivr.net/npm/bootstrap@5.3.3/dist/css/bootstrap.min.css" rel="stylesheet">
-    <script src="https://cdn.jsdelivr.net/npm/chart.js@4.4.1/dist/chart.umd.min.js"></script>
+    {% set css = vendor_asset('bootstrap-5.3.3.min.css') %}
+    {% set chartjs = vendor_asset('chart-4.4.1.umd.min.js') %}
+    <link href="{{ css.url }}" rel="stylesheet"{% if css.integrity %} integrity="{{ css.integrity }}"{% endif %}>
+    <script src="{{ chartjs.url }}"{% if chartjs.integrity %} integrity="{{ chartjs.integrity }}"{% endif %}></script>
   </head>
   <body class="bg-light">
     <nav class="navbar navbar-expand-lg bg-body-tertiary border-bottom mb-3">
@@ -140,13 +486,15 @@ layout = """
           <div class="alert alert-info">{{ messages|join(' ') }}</div>
         {% endif %}
       {% endwith %}
-      {{ content|safe }}
+      {% block content %}{% endblock %}
     </main>
   </body>
 </html>
 """
 
 login_tpl = """
+{% extends "layout.html" %}
+{% block content %}
 <div class="row justify-content-center">
   <div class="col-md-4">
     <div class="card shadow">
@@ -167,9 +515,12 @@ login_tpl = """
     </div>
   </div>
 </div>
+{% endblock %}
 """
 
 dashboard_tpl = """
+{% extends "layout.html" %}
+{% block content %}
 <div class="card shadow">
   <div class="card-body">
     <h5 class="card-title">Archivio pezzi</h5>
@@ -223,9 +574,12 @@ dashboard_tpl = """
     </div>
   </div>
 </div>
+{% endblock %}
 """
 
 item_form_tpl = """
+{% extends "layout.html" %}
+{% block content %}
 <div class="row justify-content-center">
   <div class="col-lg-8">
     <div class="card shadow">
@@ -259,9 +613,12 @@ item_form_tpl = """
     </div>
   </div>
 </div>
+{% endblock %}
 """
 
 movement_form_tpl = """
+{% extends "layout.html" %}
+{% block content %}
 <div class="row justify-content-center">
   <div class="col-lg-6">
     <div class="card shadow">
@@ -282,7 +639,7 @@ movement_form_tpl = """
             </div>
             <div class="col-sm-4">
               <label class="form-label">Data</label>
-              <input name="when" type="datetime-local" class="form-control" value="{{ default_when }}">
+              <input name="when" type="datetime-local" class="form-control" id="when_input">
             </div>
             <div class="col-12">
               <label class="form-label">Nota (opzionale)</label>
@@ -292,26 +649,70 @@ movement_form_tpl = """
           <div class="mt-3 d-flex gap-2">
             <button class="btn btn-primary">Registra</button>
             <a class="btn btn-secondary" href="{{ url_for('dashboard') }}">Annulla</a>
+            <a class="btn btn-link ms-auto" href="{{ url_for('add_movements_bulk', item_id=item.id) }}">Importa più movimenti (CSV)</a>
+          </div>
+        </form>
+        <script>
+          // default: now in UTC, like the server-side fallback
+          document.getElementById('when_input').value = new Date().toISOString().slice(0, 16);
+        </script>
+      </div>
+    </div>
+  </div>
+</div>
+{% endblock %}
+"""
+
+movement_bulk_tpl = """
+{% extends "layout.html" %}
+{% block content %}
+<div class="row justify-content-center">
+  <div class="col-lg-8">
+    <div class="card shadow">
+      <div class="card-body">
+        <h5 class="card-title">Importa movimenti per <code>{{ item.full_code }}</code></h5>
+        <form method="post">
+          <label class="form-label">Righe CSV: <code>direzione,quantità,data,nota</code> (data <code>YYYY-MM-DDTHH:MM</code> opzionale; nota tra virgolette se contiene virgole)</label>
+          <textarea name="csv" class="form-control font-monospace" rows="10" placeholder="IN,10,2024-05-02T08:30,DDT 123&#10;OUT,3,,reso" required></textarea>
+          <div class="mt-3 d-flex gap-2">
+            <button class="btn btn-primary">Importa</button>
+            <a class="btn btn-secondary" href="{{ url_for('add_movement', item_id=item.id) }}">Annulla</a>
           </div>
         </form>
       </div>
     </div>
   </div>
 </div>
+{% endblock %}
 """
 
 users_tpl = """
+{% extends "layout.html" %}
+{% block content %}
 <div class="card shadow">
   <div class="card-body">
     <div class="d-flex justify-content-between align-items-center mb-3">
       <h5 class="card-title">Gestione utenti</h5>
-      <a class="btn btn-sm btn-primary" href="{{ url_for('create_user') }}">+ Nuovo utente</a>
+      <div class="d-flex gap-2">
+        <a class="btn btn-sm btn-outline-primary" href="{{ url_for('import_users') }}">Importa utenti</a>
+        <a class="btn btn-sm btn-primary" href="{{ url_for('create_user') }}">+ Nuovo utente</a>
+      </div>
     </div>
+    <form id="bulk-users" method="post" action="{{ url_for('bulk_users') }}" class="d-flex gap-2 mb-2">
+      <input type="hidden" name="csrf_token" value="{{ csrf_token() }}">
+      <select name="action" class="form-select form-select-sm w-auto">
+        <option value="block">Blocca selezionati</option>
+        <option value="unblock">Sblocca selezionati</option>
+        <option value="delete">Elimina selezionati</option>
+      </select>
+      <button class="btn btn-sm btn-outline-secondary" onclick="return confirm('Applicare l\\'azione agli utenti selezionati?');">Applica</button>
+    </form>
     <table class="table table-sm table-striped align-middle">
-      <thead><tr><th>ID</th><th>Username</th><th>Ruolo</th><th>Stato</th><th></th></tr></thead>
+      <thead><tr><th></th><th>ID</th><th>Username</th><th>Ruolo</th><th>Stato</th><th></th></tr></thead>
       <tbody>
         {% for u in users %}
         <tr>
+          <td>{% if u.id != cu.id %}<input type="checkbox" class="form-check-input" name="ids" value="{{ u.id }}" form="bulk-users">{% endif %}</td>
           <td>{{ u.id }}</td>
           <td>{{ u.username }}</td>
           <td>{{ u.role }}</td>
@@ -333,9 +734,12 @@ users_tpl = """
     </table>
   </div>
 </div>
+{% endblock %}
 """
 
 user_form_tpl = """
+{% extends "layout.html" %}
+{% block content %}
 <div class="row justify-content-center">
   <div class="col-md-6">
     <div class="card shadow">
@@ -366,9 +770,35 @@ user_form_tpl = """
     </div>
   </div>
 </div>
+{% endblock %}
+"""
+
+users_import_tpl = """
+{% extends "layout.html" %}
+{% block content %}
+<div class="row justify-content-center">
+  <div class="col-lg-8">
+    <div class="card shadow">
+      <div class="card-body">
+        <h5 class="card-title">Importa utenti</h5>
+        <form method="post">
+          <label class="form-label">Una riga per utente: <code>username,password,ruolo</code> (ruolo <code>user</code> o <code>admin</code>, default <code>user</code>)</label>
+          <textarea name="csv" class="form-control font-monospace" rows="10" required></textarea>
+          <div class="mt-3 d-flex gap-2">
+            <button class="btn btn-primary">Importa</button>
+            <a class="btn btn-secondary" href="{{ url_for('users') }}">Annulla</a>
+          </div>
+        </form>
+      </div>
+    </div>
+  </div>
+</div>
+{% endblock %}
 """
 
 stock_lookup_tpl = """
+{% extends "layout.html" %}
+{% block content %}
 <div class="card shadow">
   <div class="card-body">
     <h5 class="card-title">Verifica disponibilità per codice</h5>
@@ -381,8 +811,8 @@ stock_lookup_tpl = """
           <label class="input-group-text" for="user_id">Utente</label>
           <select class="form-select" id="user_id" name="user_id">
             <option value="">Tutti</option>
-            {% for u in users_list %}
-              <option value="{{ u.id }}" {% if selected_user_id == u.id %}selected{% endif %}>{{ u.username }} ({{ u.role }})</option>
+            {% for uid, uname, urole in users_list %}
+              <option value="{{ uid }}" {% if selected_user_id == uid %}selected{% endif %}>{{ uname }} ({{ urole }})</option>
             {% endfor %}
           </select>
         </div>
@@ -393,7 +823,7 @@ stock_lookup_tpl = """
     </form>
 
     {% if code or selected_user_id %}
-      {% if rows %}
+      {% if pagination.total %}
       <p class="mb-3"><strong>Totale quantità (tutte le righe):</strong> {{ total_qty }}</p>
 
       <!-- Raggruppato per FINIS e Utente -->
@@ -430,8 +860,8 @@ stock_lookup_tpl = """
       </div>
 
       <!-- Dettaglio righe -->
-      <details>
-        <summary class="mb-2">Dettaglio righe (per codice completo)</summary>
+      <details{% if pagination.page > 1 %} open{% endif %}>
+        <summary class="mb-2">Dettaglio righe (per codice completo){% if pagination.pages > 1 %} &ndash; pagina {{ pagination.page }} di {{ pagination.pages }}, {{ pagination.total }} righe{% endif %}</summary>
         <div class="table-responsive">
           <table class="table table-sm table-striped align-middle">
             <thead><tr><th>Utente</th><th>FINIS</th><th>Codice completo</th><th>Descrizione</th><th>Quantità</th></tr></thead>
@@ -448,6 +878,8 @@ stock_lookup_tpl = """
             </tbody>
           </table>
         </div>
+        {% if pagination.has_prev %}<a class="btn btn-sm btn-outline-secondary" href="{{ url_for('stock_lookup', code=code, user_id=selected_user_id or '', page=pagination.prev_num) }}">Precedenti</a>{% endif %}
+        {% if pagination.has_next %}<a class="btn btn-sm btn-outline-secondary" href="{{ url_for('stock_lookup', code=code, user_id=selected_user_id or '', page=pagination.next_num) }}">Successive</a>{% endif %}
       </details>
       {% else %}
         <div class="alert alert-warning">Nessun risultato per i filtri impostati.</div>
@@ -455,10 +887,13 @@ stock_lookup_tpl = """
     {% endif %}
   </div>
 </div>
+{% endblock %}
 """
 
 
 stats_tpl = """
+{% extends "layout.html" %}
+{% block content %}
 <div class="card shadow">
   <div class="card-body">
     <h5 class="card-title">Statistiche movimenti</h5>
@@ -479,8 +914,8 @@ stats_tpl = """
         <label class="form-label">Utente (opzionale)</label>
         <select class="form-select" name="user_id">
           <option value="">Tutti</option>
-          {% for u in users_list %}
-            <option value="{{ u.id }}" {% if selected_user_id == u.id %}selected{% endif %}>{{ u.username }} ({{ u.role }})</option>
+          {% for uid, uname, urole in users_list %}
+            <option value="{{ uid }}" {% if selected_user_id == uid %}selected{% endif %}>{{ uname }} ({{ urole }})</option>
           {% endfor %}
         </select>
       </div>
@@ -530,9 +965,11 @@ stats_tpl = """
       </div>
     </div>
 
-    {% if movements %}
-    <details>
-      <summary>Dettaglio movimenti ({{ movements|length }})</summary>
+    {% if not show_movements %}
+    <a class="btn btn-sm btn-outline-secondary" href="{{ url_for('stats', show_movements=1, **filter_args) }}">Mostra dettaglio movimenti</a>
+    {% else %}
+    <details open>
+      <summary>Dettaglio movimenti ({{ movements|length }}{% if page > 1 or has_more %}, pagina {{ page }}{% endif %}, dal più recente)</summary>
       <div class="table-responsive mt-2">
         <table class="table table-sm table-striped align-middle">
           <thead><tr><th>Data</th><th>Utente</th><th>FINIS</th><th>Codice</th><th>Dir</th><th>Q.tà</th><th>Nota</th></tr></thead>
@@ -551,16 +988,19 @@ stats_tpl = """
           </tbody>
         </table>
       </div>
+      {% if page > 1 %}<a class="btn btn-sm btn-outline-secondary" href="{{ url_for('stats', show_movements=1, page=page - 1, **filter_args) }}">Più recenti</a>{% endif %}
+      {% if has_more %}<a class="btn btn-sm btn-outline-secondary" href="{{ url_for('stats', show_movements=1, page=page + 1, **filter_args) }}">Meno recenti</a>{% endif %}
     </details>
     {% endif %}
   </div>
 </div>
 
 <script>
-const labels = {{ labels|tojson }};
-const dataIn = {{ series_in|tojson }};
-const dataOut = {{ series_out|tojson }};
-const dataStock = {{ series_stock|tojson }};
+const chart = {{ chart|tojson }};
+const labels = chart.labels;
+const dataIn = chart.in;
+const dataOut = chart.out;
+const dataStock = chart.stock;
 
 new Chart(document.getElementById('barInOut'), {
   type: 'bar',
@@ -589,23 +1029,119 @@ new Chart(document.getElementById('lineStock'), {
   }
 });
 </script>
+{% endblock %}
 """
 
-def render_page(tpl_string, **ctx):
-    """Render inner template with full context and then apply layout."""
-    cu = current_user()
-    inner = render_template_string(
-        tpl_string,
-        cu=cu,
-        username_of=username_of,
-        **ctx
-    )
-    return render_template_string(
-        layout,
-        content=inner,
-        cu=cu,
-        username_of=username_of,
-        **ctx
+def _load_vendor_integrity():
+    try:
+        with open(os.path.join(VENDOR_DIR, "integrity.json")) as f:
+            return json.load(f)
+    except (OSError, ValueError):
+        return {}
+
+_VENDOR_INTEGRITY = _load_vendor_integrity()  # filename -> SRI hash, only for mirrored files
+
+def vendor_asset(name):
+    if name in _VENDOR_INTEGRITY:
+        return {"url": url_for("vendor_static", filename=name), "integrity": _VENDOR_INTEGRITY[name]}
+    return {"url": VENDOR_ASSETS[name], "integrity": None}
+
+app.jinja_env.globals["vendor_asset"] = vendor_asset
+
+# Whitespace is only significant inside these elements; everywhere else a run of it renders as one space.
+_RAW_BLOCK = re.compile(r"(<(?:pre|textarea|script)\b.*?</(?:pre|textarea|script)>)", re.S | re.I)
+
+def _minify(tpl: str) -> str:
+    """Collapse whitespace runs to a single space outside <pre>/<textarea>/<script>."""
+    parts = _RAW_BLOCK.split(tpl)
+    parts[::2] = [re.sub(r"\s+", " ", p) for p in parts[::2]]
+    return "".join(parts).strip()
+
+# Pages extend layout.html; Jinja compiles each one once and caches it in the environment.
+app.jinja_loader = DictLoader({name: _minify(src) for name, src in {
+    "layout.html": layout,
+    "login.html": login_tpl,
+    "dashboard.html": dashboard_tpl,
+    "item_form.html": item_form_tpl,
+    "movement_form.html": movement_form_tpl,
+    "movement_bulk.html": movement_bulk_tpl,
+    "users.html": users_tpl,
+    "user_form.html": user_form_tpl,
+    "users_import.html": users_import_tpl,
+    "stock_lookup.html": stock_lookup_tpl,
+    "stats.html": stats_tpl,
+}.items()})
+
+# |tojson output is embedded in pages: drop the spaces after separators
+app.jinja_env.policies["json.dumps_kwargs"] = {"sort_keys": True, "separators": (",", ":")}
+
+@app.context_processor
+def _inject_template_helpers():
+    return {"cu": current_user(), "username_of": username_of, "csrf_token": csrf_token}
+
+# ----------------------------------------------------------------------------
+# Vendored static assets
+# ----------------------------------------------------------------------------
+@app.route("/static/vendor/<path:filename>")
+def vendor_static(filename):
+    """Versioned files: cache for a year and send the precompressed sibling the client accepts."""
+    one_year = 31536000
+    resp = None
+    for encoding, suffix in (("br", ".br"), ("gzip", ".gz")):
+        if request.accept_encodings[encoding] and os.path.isfile(os.path.join(VENDOR_DIR, filename + suffix)):
+            resp = send_from_directory(VENDOR_DIR, filename + suffix, max_age=one_year,
+                                       mimetype=mimetypes.guess_type(filename)[0])
+            resp.headers["Content-Encoding"] = encoding
+            break
+    if resp is None:
+        resp = send_from_directory(VENDOR_DIR, filename, max_age=one_year)
+    resp.vary.add("Accept-Encoding")
+    resp.cache_control.immutable = True
+    return resp
+
+@app.cli.command("vendor-assets")
+def vendor_assets_command():
+    """Mirror VENDOR_ASSETS into static/vendor with .gz/.br siblings and SRI hashes."""
+    import base64
+    import gzip
+    import hashlib
+    import urllib.request
+    try:
+        import brotli
+    except ImportError:
+        brotli = None
+        print("[VENDOR] Modulo 'brotli' non installato: genero solo i file .gz.")
+
+    os.makedirs(VENDOR_DIR, exist_ok=True)
+    integrity = {}
+    for name, url in VENDOR_ASSETS.items():
+        with urllib.request.urlopen(url, timeout=30) as r:
+            data = r.read()
+        variants = {"": data, ".gz": gzip.compress(data, compresslevel=9, mtime=0)}
+        if brotli:
+            variants[".br"] = brotli.compress(data, quality=11)
+        for suffix, payload in variants.items():
+            with open(os.path.join(VENDOR_DIR, name + suffix), "wb") as f:
+                f.write(payload)
+        integrity[name] = "sha384-" + base64.b64encode(hashlib.sha384(data).digest()).decode()
+        print(f"[VENDOR] {name}: {len(data)} byte ({', '.join(f'{s} {len(p)}' for s, p in variants.items() if s)})")
+    with open(os.path.join(VENDOR_DIR, "integrity.json"), "w") as f:
+        json.dump(integrity, f, indent=2)
+
+# ----------------------------------------------------------------------------
+# Health
+# ----------------------------------------------------------------------------
+@app.route("/healthz")
+def healthz():
+    hits, misses = _USERNAME_CACHE_STATS["hits"], _USERNAME_CACHE_STATS["misses"]
+    return jsonify(
+        status="ok",
+        username_cache={
+            "size": len(_USERNAME_CACHE),
+            "hits": hits,
+            "misses": misses,
+            "hit_ratio": round(hits / (hits + misses), 3) if hits + misses else None,
+        },
     )
 
 # ----------------------------------------------------------------------------
@@ -619,12 +1155,12 @@ def login():
             if not u.is_active:
                 flash("Account bloccato. Contatta un amministratore.")
             else:
-                session["user_id"] = u.id
+                remember_user(u)
                 flash("Login eseguito.")
                 return redirect(request.args.get("next") or url_for("dashboard"))
         else:
             flash("Credenziali non valide.")
-    return render_page(login_tpl)
+    return render_template("login.html")
 
 @app.route("/logout")
 def logout():
@@ -643,13 +1179,17 @@ def dashboard():
     base_q = Item.query
     if cu.role != "admin":
         base_q = base_q.filter_by(created_by_id=cu.id)
-    if q:
-        like = f"%{q}%"
-        base_q = base_q.filter(db.or_(Item.finis_code.ilike(like),
-                                      Item.full_code.ilike(like),
-                                      Item.description.ilike(like)))
-    items = base_q.order_by(Item.updated_at.desc()).limit(500).all()
-    return render_page(dashboard_tpl, items=items)
+    if len(q) >= SEARCH_MIN_LEN:
+        base_q = base_q.filter(item_search_clause(q))
+    elif q:
+        # One or two characters match most of the archive: show the latest items instead.
+        flash(f"Inserisci almeno {SEARCH_MIN_LEN} caratteri per la ricerca.")
+    items = base_q.order_by(Item.updated_at.desc()).limit(500).yield_per(100)
+    items = iter_prefetching_usernames(items, ("created_by_id", "updated_by_id"))
+    # The session cookie is saved before the streamed body runs: pop the flashes now
+    # (Flask caches them for the layout's get_flashed_messages() in this request).
+    get_flashed_messages()
+    return stream_template("dashboard.html", items=items)
 
 @app.route("/items/new", methods=["GET","POST"])
 @login_required
@@ -669,37 +1209,41 @@ def add_item():
         db.session.commit()
         flash("Elemento creato.")
         return redirect(url_for("dashboard"))
-    return render_page(item_form_tpl, item=None)
+    return render_template("item_form.html", item=None)
 
 @app.route("/items/<int:item_id>/edit", methods=["GET","POST"])
 @login_required
 def edit_item(item_id):
     cu = current_user()
-    item = db.session.get(Item, item_id)
-    if not item:
-        abort(404)
-    if not can_edit(item, cu):
-        abort(403)
+    item = get_editable_item(item_id, cu)
     if request.method == "POST":
-        item.finis_code = request.form["finis_code"].strip()
-        item.full_code = request.form["full_code"].strip()
+        codes = {"finis_code": request.form["finis_code"].strip(),
+                 "full_code": request.form["full_code"].strip()}
+        if (item.finis_code, item.full_code) != (codes["finis_code"], codes["full_code"]):
+            db.session.execute(db.update(Movement).where(Movement.item_id == item.id).values(**codes))
+            if item.finis_code != codes["finis_code"]:
+                conn = db.session.connection(bind_arguments={"mapper": inspect(MovementDailyStats)})
+                refresh_movement_daily_stats(conn, {item.finis_code, codes["finis_code"]})
+        item.finis_code = codes["finis_code"]
+        item.full_code = codes["full_code"]
         item.description = request.form["description"].strip()
         item.quantity = int(request.form["quantity"] or 0)
         item.updated_by_id = cu.id
         db.session.commit()
         flash("Elemento aggiornato.")
         return redirect(url_for("dashboard"))
-    return render_page(item_form_tpl, item=item)
+    return render_template("item_form.html", item=item)
 
 @app.route("/items/<int:item_id>/delete")
 @login_required
 def delete_item(item_id):
     cu = current_user()
-    item = db.session.get(Item, item_id)
-    if not item:
-        abort(404)
-    if not can_edit(item, cu):
-        abort(403)
+    item = get_editable_item(item_id, cu)
+    # Movements of a deleted item are kept but no longer counted in the stats
+    db.session.execute(db.update(Movement).where(Movement.item_id == item.id)
+                       .values(finis_code=None, full_code=None))
+    conn = db.session.connection(bind_arguments={"mapper": inspect(MovementDailyStats)})
+    refresh_movement_daily_stats(conn, {item.finis_code})
     db.session.delete(item)
     db.session.commit()
     flash("Elemento eliminato.")
@@ -712,11 +1256,7 @@ def delete_item(item_id):
 @login_required
 def add_movement(item_id):
     cu = current_user()
-    item = db.session.get(Item, item_id)
-    if not item:
-        abort(404)
-    if not can_edit(item, cu):
-        abort(403)
+    item = get_editable_item(item_id, cu)
 
     if request.method == "POST":
         direction = request.form.get("direction")
@@ -734,25 +1274,112 @@ def add_movement(item_id):
         except Exception:
             when_dt = datetime.utcnow()
 
-        mov = Movement(item_id=item.id, direction=direction, qty=qty, when=when_dt, note=note, user_id=cu.id)
+        mov = Movement(item_id=item.id, direction=direction, qty=qty, when=when_dt, note=note, user_id=cu.id,
+                       finis_code=item.finis_code, full_code=item.full_code)
         db.session.add(mov)
+        record_daily_stats([{"finis_code": item.finis_code, "user_id": cu.id, "when": when_dt,
+                             "direction": direction, "qty": qty}])
 
-        # Aggiorna quantità item (coerente con movimenti)
-        if direction == "IN":
-            item.quantity += qty
-        else:
-            item.quantity -= qty
-            if item.quantity < 0:
-                item.quantity = 0  # semplice protezione; opzionale: consentire negativi
-        item.updated_by_id = cu.id
+        # Aggiorna quantità item (coerente con movimenti): un solo UPDATE, mai sotto 0
+        apply_quantity_delta(item, qty if direction == "IN" else -qty, cu.id)
 
         db.session.commit()
         flash("Movimento registrato.")
         return redirect(url_for("dashboard"))
 
-    # default datetime-local value
-    default_when = datetime.utcnow().strftime("%Y-%m-%dT%H:%M")
-    return render_page(movement_form_tpl, item=item, default_when=default_when)
+    return render_template("movement_form.html", item=item)
+
+MOVEMENT_FIELDS = ("direction", "qty", "when", "note")
+COPY_THRESHOLD = 100  # above this many rows, Postgres gets COPY instead of INSERT
+
+def _parse_movement_rows(records, item, user_id):
+    """Validate bulk movement records (dicts) into Movement row dicts; returns (rows, error)."""
+    rows = []
+    now = datetime.utcnow()
+    for n, rec in enumerate(records, start=1):
+        if not isinstance(rec, dict):
+            return None, f"Riga {n}: formato non valido."
+        if rec.get(None):
+            # csv.DictReader puts fields beyond MOVEMENT_FIELDS here, e.g. an unquoted comma in the note
+            return None, f"Riga {n}: troppi campi (racchiudere la nota tra virgolette se contiene virgole)."
+        direction = str(rec.get("direction") or "").strip().upper()
+        # only whole numbers: no float truncation (2.9 -> 2), no JSON true -> 1
+        raw_qty = rec.get("qty")
+        if isinstance(raw_qty, int) and not isinstance(raw_qty, bool):
+            qty = raw_qty
+        elif isinstance(raw_qty, str) and raw_qty.strip().isascii() and raw_qty.strip().isdigit():
+            qty = int(raw_qty.strip())
+        else:
+            qty = 0
+        if direction not in ("IN", "OUT") or qty <= 0:
+            return None, f"Riga {n}: direzione o quantità non valida."
+        when_str = str(rec.get("when") or "").strip()
+        try:
+            when_dt = datetime.strptime(when_str.replace(" ", "T"), "%Y-%m-%dT%H:%M") if when_str else now
+        except ValueError:
+            return None, f"Riga {n}: data non valida ({when_str})."
+        note = str(rec.get("note") or "").strip()
+        rows.append({"item_id": item.id, "direction": direction, "qty": qty,
+                     "when": when_dt, "note": note, "user_id": user_id,
+                     "finis_code": item.finis_code, "full_code": item.full_code})
+    if not rows:
+        return None, "Nessun movimento da importare."
+    return rows, None
+
+def _copy_movements(conn, rows):
+    """Postgres fast path: stream the rows through COPY (psycopg2)."""
+    cols = ["item_id", "direction", "qty", "when", "note", "user_id", "finis_code", "full_code"]
+
+    def field(v):
+        if v is None:
+            return "\\N"
+        v = v.isoformat(sep=" ") if isinstance(v, datetime) else str(v)
+        return v.replace("\\", "\\\\").replace("\t", "\\t").replace("\n", "\\n").replace("\r", "\\r")
+
+    buf = io.StringIO("".join("\t".join(field(r[c]) for c in cols) + "\n" for r in rows))
+    cursor = conn.connection.cursor()
+    try:
+        cursor.copy_from(buf, Movement.__table__.name, sep="\t", columns=cols)  # psycopg2 >= 2.9 quotes "when"
+    finally:
+        cursor.close()
+
+@app.route("/items/<int:item_id>/move_bulk", methods=["GET","POST"])
+@login_required
+def add_movements_bulk(item_id):
+    """Insert many movements for one item in a single statement (CSV form or JSON list)."""
+    cu = current_user()
+    item = get_editable_item(item_id, cu)
+
+    if request.method == "POST":
+        if request.is_json:
+            payload = request.get_json(silent=True)
+            records = payload if isinstance(payload, list) else [None]
+        else:
+            reader = csv.DictReader(io.StringIO(request.form.get("csv", "")), fieldnames=MOVEMENT_FIELDS)
+            records = [r for r in reader if (r["direction"] or "").strip().lower() not in ("", "direction", "direzione")]
+        rows, error = _parse_movement_rows(records, item, cu.id)
+        if error:
+            if request.is_json:
+                return jsonify(error=error), 400
+            flash(error)
+            return redirect(url_for("add_movements_bulk", item_id=item.id))
+
+        conn = db.session.connection(bind_arguments={"mapper": inspect(Movement)})
+        if conn.dialect.name == "postgresql" and len(rows) > COPY_THRESHOLD:
+            _copy_movements(conn, rows)
+        else:
+            db.session.execute(db.insert(Movement), rows)
+        record_daily_stats(rows)
+        delta = sum(r["qty"] if r["direction"] == "IN" else -r["qty"] for r in rows)
+        quantity = apply_quantity_delta(item, delta, cu.id)
+        db.session.commit()
+
+        if request.is_json:
+            return jsonify(inserted=len(rows), quantity=quantity)
+        flash(f"{len(rows)} movimenti registrati.")
+        return redirect(url_for("dashboard"))
+
+    return render_template("movement_bulk.html", item=item)
 
 # ----------------------------------------------------------------------------
 # Admin: Users (users DB)
@@ -760,7 +1387,7 @@ def add_movement(item_id):
 @app.route("/admin/users")
 @admin_required
 def users():
-    return render_page(users_tpl, users=User.query.order_by(User.id).all())
+    return render_template("users.html", users=User.query.order_by(User.id).all())
 
 @app.route("/admin/users/new", methods=["GET","POST"])
 @admin_required
@@ -776,9 +1403,41 @@ def create_user():
             u.set_password(password)
             db.session.add(u)
             db.session.commit()
+            invalidate_user_caches()
             flash("Utente creato.")
             return redirect(url_for("users"))
-    return render_page(user_form_tpl, user=None)
+    return render_template("user_form.html", user=None)
+
+@app.route("/admin/users/import", methods=["GET","POST"])
+@admin_required
+def import_users():
+    if request.method == "POST":
+        existing = {name for (name,) in db.session.execute(db.select(User.username))}
+        to_create, skipped = [], []
+        for row in csv.reader(io.StringIO(request.form.get("csv", ""))):
+            if not row or not row[0].strip():
+                continue
+            username = row[0].strip()
+            password = row[1].strip() if len(row) > 1 else ""
+            role = row[2].strip() if len(row) > 2 and row[2].strip() in ("user", "admin") else "user"
+            if not password or username in existing:
+                skipped.append(username)
+                continue
+            existing.add(username)
+            # KDF runs on the pool while the remaining rows are parsed
+            future = _HASH_POOL.submit(generate_password_hash, password, method=PASSWORD_HASH_METHOD)
+            to_create.append((User(username=username, role=role, is_active=True), future))
+        for u, future in to_create:
+            u.password_hash = future.result()
+            db.session.add(u)
+        db.session.commit()
+        invalidate_user_caches()
+        msg = f"{len(to_create)} utenti importati."
+        if skipped:
+            msg += f" Saltati (esistenti o senza password): {', '.join(skipped)}."
+        flash(msg)
+        return redirect(url_for("users"))
+    return render_template("users_import.html")
 
 @app.route("/admin/users/<int:user_id>/edit", methods=["GET","POST"])
 @admin_required
@@ -794,9 +1453,12 @@ def edit_user(user_id):
         if pwd:
             u.set_password(pwd)
         db.session.commit()
+        invalidate_user_caches()
+        if u.id == session.get("user_id"):
+            remember_user(u)
         flash("Utente aggiornato.")
         return redirect(url_for("users"))
-    return render_page(user_form_tpl, user=u)
+    return render_template("user_form.html", user=u)
 
 @app.route("/admin/users/<int:user_id>/delete")
 @admin_required
@@ -809,6 +1471,7 @@ def delete_user(user_id):
         abort(404)
     db.session.delete(u)
     db.session.commit()
+    invalidate_user_caches()
     flash("Utente eliminato.")
     return redirect(url_for("users"))
 
@@ -826,6 +1489,32 @@ def block_user(user_id):
     flash("Utente bloccato.")
     return redirect(url_for("users"))
 
+BULK_USER_ACTIONS = {"block": "bloccati", "unblock": "sbloccati", "delete": "eliminati"}
+
+@app.route("/admin/users/bulk", methods=["POST"])
+@admin_required
+def bulk_users():
+    """Block, unblock or delete the selected users with one statement and one commit."""
+    check_csrf()
+    action = request.form.get("action")
+    ids = {int(i) for i in request.form.getlist("ids") if i.isdigit()}
+    if action not in BULK_USER_ACTIONS or not ids:
+        flash("Seleziona almeno un utente e un'azione.")
+        return redirect(url_for("users"))
+    if current_user().id in ids and action != "unblock":
+        ids.discard(current_user().id)
+        flash("Non puoi bloccare o eliminare te stesso: escluso dalla selezione.")
+
+    if action == "delete":
+        res = db.session.execute(db.delete(User).where(User.id.in_(ids)))
+    else:
+        res = db.session.execute(db.update(User).where(User.id.in_(ids)).values(is_active=action == "unblock"))
+    db.session.commit()
+    if action == "delete":
+        invalidate_user_caches()
+    flash(f"{res.rowcount} utenti {BULK_USER_ACTIONS[action]}.")
+    return redirect(url_for("users"))
+
 @app.route("/admin/users/<int:user_id>/unblock")
 @admin_required
 def unblock_user(user_id):
@@ -840,46 +1529,57 @@ def unblock_user(user_id):
 # ----------------------------------------------------------------------------
 # Admin: stock lookup (stock DB) with code/user filters and FINIS groupings
 # ----------------------------------------------------------------------------
+STOCK_PAGE_SIZE = 100
+
 @app.route("/admin/stock")
 @admin_required
 def stock_lookup():
     code = request.args.get("code","").strip()
     user_id = request.args.get("user_id", "").strip()
     selected_user_id = int(user_id) if user_id.isdigit() else None
+    page = request.args.get("page", 1, type=int)
+    users_list = get_users_list()
+
+    if not (code or selected_user_id):
+        # no filter yet: the page only shows the search form
+        return render_template("stock_lookup.html", code=code, users_list=users_list, selected_user_id=None)
 
     q = Item.query
     if code:
-        like = f"%{code}%"
-        q = q.filter(db.or_(Item.finis_code.ilike(like), Item.full_code.ilike(like)))
+        q = q.filter(item_search_clause(code, ("finis_code", "full_code")))
     if selected_user_id:
         q = q.filter(Item.created_by_id == selected_user_id)
 
-    rows = q.order_by(Item.created_by_id).all()
-    total_qty = sum(r.quantity for r in rows)
-
-    by_user = defaultdict(int)   # (finis, user_id) -> qty
-    by_finis = defaultdict(int)  # finis -> qty
-    for r in rows:
-        by_user[(r.finis_code, r.created_by_id)] += r.quantity
-        by_finis[r.finis_code] += r.quantity
-
-    grouped_by_user = [
-        type("Row", (), {"finis_code": k[0], "user_id": k[1], "qty": v})
-        for k, v in by_user.items()
-    ]
-    grouped_by_user.sort(key=lambda x: (x.finis_code, x.user_id))
-
-    finis_totals = [
-        type("Row", (), {"finis_code": k, "qty": v})
-        for k, v in by_finis.items()
-    ]
-    finis_totals.sort(key=lambda x: (-x.qty, x.finis_code))
-
-    users_list = User.query.order_by(User.username).all()
-    return render_page(
-        stock_lookup_tpl,
+    # detail rows one page at a time; the totals below are aggregated over all of them
+    pagination = q.order_by(Item.created_by_id, Item.id).paginate(
+        page=page, per_page=STOCK_PAGE_SIZE, error_out=False)
+    rows = pagination.items
+
+    if selected_user_id and not code:
+        # user-only filter: the rollup already holds the per-FINIS sums
+        rollup_q = db.select(StockRollup).where(StockRollup.user_id == selected_user_id, StockRollup.item_count > 0)
+        grouped_by_user = db.session.execute(rollup_q.order_by(StockRollup.finis_code)).scalars().all()
+        finis_totals = db.session.execute(
+            rollup_q.order_by(StockRollup.qty.desc(), StockRollup.finis_code)).scalars().all()
+    else:
+        qty_sum = db.func.sum(Item.quantity)
+        grouped_by_user = q.with_entities(
+            Item.finis_code,
+            Item.created_by_id.label("user_id"),
+            qty_sum.label("qty"),
+        ).group_by(Item.finis_code, Item.created_by_id).order_by(Item.finis_code, Item.created_by_id).all()
+        finis_totals = q.with_entities(Item.finis_code, qty_sum.label("qty")).group_by(
+            Item.finis_code).order_by(qty_sum.desc(), Item.finis_code).all()
+
+    total_qty = sum(f.qty for f in finis_totals)
+    # the groups span every matching owner, not just those on this page
+    prefetch_usernames({r.created_by_id for r in rows} | {g.user_id for g in grouped_by_user})
+
+    return render_template(
+        "stock_lookup.html",
         code=code,
         rows=rows,
+        pagination=pagination,
         total_qty=total_qty,
         grouped_by_user=grouped_by_user,
         finis_totals=finis_totals,
@@ -890,6 +1590,33 @@ def stock_lookup():
 # ----------------------------------------------------------------------------
 # Stats (admin)
 # ----------------------------------------------------------------------------
+MOVEMENTS_PAGE_SIZE = 200
+MovementRow = namedtuple("MovementRow", "when direction qty note user_id finis_code full_code")
+
+def _build_series(daily_rows, start_date, end_date, opening):
+    """Chart series for [start_date, end_date] from (day, qty_in, qty_out) rows within that range.
+
+    Returns (labels, series_in, series_out, series_stock); days without movements
+    count as 0 and the stock series is *opening* plus the running net.
+    """
+    # Calendar of the range, one entry per day (the rollup has no rows for idle days)
+    days = [start_date + timedelta(days=i) for i in range((end_date - start_date).days + 1)]
+
+    # one slot per day, addressed by its offset from start_date
+    n = len(days)
+    series_in = [0] * n
+    series_out = [0] * n
+    for d, qty_in, qty_out in daily_rows:
+        idx = (d - start_date).days  # movement_daily_stats.day is a Date column
+        assert 0 <= idx < n, "daily_rows must be filtered to [start_date, end_date]"
+        series_in[idx] = qty_in
+        series_out[idx] = qty_out
+
+    labels = [d.isoformat() for d in days]
+    # Stock series = opening + cumulative(net per day)
+    series_stock = list(accumulate(map(operator.sub, series_in, series_out), initial=opening))[1:]
+    return labels, series_in, series_out, series_stock
+
 @app.route("/admin/stats")
 @admin_required
 def stats():
@@ -903,6 +1630,11 @@ def stats():
     finis = (request.args.get("finis") or "").strip()
     user_id = (request.args.get("user_id") or "").strip()
     selected_user_id = int(user_id) if user_id.isdigit() else None
+    show_movements = request.args.get("show_movements") == "1"
+    page = request.args.get("page", "")
+    page = max(int(page), 1) if page.isdigit() else 1
+    # current filters, reused by the movement list links
+    filter_args = {k: request.args[k] for k in ("start", "end", "finis", "user_id") if request.args.get(k)}
 
     try:
         start_date = datetime.strptime(start_str, "%Y-%m-%d").date()
@@ -919,71 +1651,55 @@ def stats():
     start_dt = datetime.combine(start_date, datetime.min.time())
     end_dt = datetime.combine(end_date + timedelta(days=1), datetime.min.time())  # exclusive
 
+    # FINIS codes matching the filter, resolved on item (search index) rather than
+    # with a substring scan of movement / movement_daily_stats
+    matching_finis = db.select(Item.finis_code).where(item_search_clause(finis, ("finis_code",))).distinct()
+
     # Build base query
-    q = Movement.query.join(Item, Movement.item_id == Item.id)
+    q = Movement.query.filter(Movement.finis_code.isnot(None))
     if finis:
-        like = f"%{finis}%"
-        q = q.filter(Item.finis_code.ilike(like))
+        q = q.filter(Movement.finis_code.in_(matching_finis))
     if selected_user_id:
         q = q.filter(Movement.user_id == selected_user_id)
 
-    # For KPIs and charts we need:
-    # - Movements within [start_dt, end_dt)
-    # - Opening balance (sum IN-OUT before start_dt)
+    # Movements within [start_dt, end_dt), listed under the charts
     q_range = q.filter(Movement.when >= start_dt, Movement.when < end_dt)
-    q_before = q.filter(Movement.when < start_dt)
-
-    rows_range = q_range.add_columns(Item.finis_code, Item.full_code).order_by(Movement.when).all()
-    rows_before = q_before.all()
 
-    # Aggregate daily IN/OUT within range
-    days = []
-    cur = start_date
-    while cur <= end_date:
-        days.append(cur)
-        cur += timedelta(days=1)
-
-    by_day_in = OrderedDict((d, 0) for d in days)
-    by_day_out = OrderedDict((d, 0) for d in days)
-
-    total_in = 0
-    total_out = 0
+    # Daily IN/OUT sums and the opening balance come from movement_daily_stats:
+    # one row per (finis, user, day) instead of one per movement
+    daily_q = MovementDailyStats.query
+    if finis:
+        daily_q = daily_q.filter(MovementDailyStats.finis_code.in_(matching_finis))
+    if selected_user_id:
+        daily_q = daily_q.filter(MovementDailyStats.user_id == selected_user_id)
+    daily_rows = daily_q.filter(
+        MovementDailyStats.day >= start_date, MovementDailyStats.day <= end_date
+    ).with_entities(
+        MovementDailyStats.day,
+        db.func.sum(MovementDailyStats.qty_in),
+        db.func.sum(MovementDailyStats.qty_out),
+    ).group_by(MovementDailyStats.day).all()
+
+    # The movement list is only loaded on request, newest first, one page at a time
     movements_list = []
+    has_more = False
+    if show_movements:
+        # Movement has no relationships: the codes are on the row and usernames are prefetched
+        # below, so one query covers the list; only the columns it shows are selected
+        rows_range = q_range.with_entities(*(getattr(Movement, f) for f in MovementRow._fields)).order_by(
+            Movement.when.desc(), Movement.id.desc()).limit(MOVEMENTS_PAGE_SIZE + 1).offset((page - 1) * MOVEMENTS_PAGE_SIZE).all()
+        has_more = len(rows_range) > MOVEMENTS_PAGE_SIZE
+        movements_list = [MovementRow._make(r) for r in rows_range[:MOVEMENTS_PAGE_SIZE]]
 
-    for m, finis_code, full_code in rows_range:
-        d = m.when.date()
-        if d in by_day_in:
-            if m.direction == "IN":
-                by_day_in[d] += m.qty
-                total_in += m.qty
-            else:
-                by_day_out[d] += m.qty
-                total_out += m.qty
-        movements_list.append(type("Row", (), {
-            "when": m.when,
-            "direction": m.direction,
-            "qty": m.qty,
-            "note": m.note,
-            "user_id": m.user_id,
-            "finis_code": finis_code,
-            "full_code": full_code
-        }))
-
-    # Opening balance from movements before start
-    opening = 0
-    for m in rows_before:
-        opening += m.qty if m.direction == "IN" else -m.qty
+        prefetch_usernames({m.user_id for m in movements_list})
 
-    # Stock series = opening + cumulative(net per day)
-    labels = [d.isoformat() for d in days]
-    series_in = [by_day_in[d] for d in days]
-    series_out = [by_day_out[d] for d in days]
+    # Opening balance from movements before start: net IN-OUT summed by the DB
+    opening = daily_q.filter(MovementDailyStats.day < start_date).with_entities(
+        db.func.coalesce(db.func.sum(MovementDailyStats.qty_in - MovementDailyStats.qty_out), 0)).scalar()
 
-    series_stock = []
-    running = opening
-    for d in days:
-        running += by_day_in[d] - by_day_out[d]
-        series_stock.append(running)
+    labels, series_in, series_out, series_stock = _build_series(daily_rows, start_date, end_date, opening)
+    total_in = sum(series_in)
+    total_out = sum(series_out)
 
     kpi_in = total_in
     kpi_out = total_out
@@ -992,14 +1708,14 @@ def stats():
     # Stock current = sum(Item.quantity) with same filters (finis & user)
     item_q = Item.query
     if finis:
-        item_q = item_q.filter(Item.finis_code.ilike(f"%{finis}%"))
+        item_q = item_q.filter(item_search_clause(finis, ("finis_code",)))
     if selected_user_id:
         item_q = item_q.filter(Item.updated_by_id == selected_user_id)  # or created_by? we use updated_by as "owner of last change"
-    kpi_stock_current = sum(i.quantity for i in item_q.all())
+    kpi_stock_current = item_q.with_entities(db.func.coalesce(db.func.sum(Item.quantity), 0)).scalar()
 
-    users_list = User.query.order_by(User.username).all()
-    return render_page(
-        stats_tpl,
+    users_list = get_users_list()
+    return render_template(
+        "stats.html",
         start_str=start_str,
         end_str=end_str,
         users_list=users_list,
@@ -1008,16 +1724,35 @@ def stats():
         kpi_out=kpi_out,
         kpi_net=kpi_net,
         kpi_stock_current=kpi_stock_current,
-        labels=labels,
-        series_in=series_in,
-        series_out=series_out,
-        series_stock=series_stock,
+        # the chart series travel as one object, serialized by a single |tojson
+        chart={"labels": labels, "in": series_in, "out": series_out, "stock": series_stock},
         movements=movements_list,
+        show_movements=show_movements,
+        page=page,
+        has_more=has_more,
+        filter_args=filter_args,
     )
 
 # ----------------------------------------------------------------------------
 # Bootstrap DBs and default admin
 # ----------------------------------------------------------------------------
+# Names of the one-off migrations already applied, per database: checked with a single
+# SELECT at boot instead of re-inspecting the schema in every worker
+SCHEMA_MIGRATIONS_DDL = "CREATE TABLE IF NOT EXISTS schema_migrations (name VARCHAR(100) PRIMARY KEY)"
+
+def _run_migrations(bind, migrations):
+    """Run each (name, fn) of *migrations* not yet recorded on *bind*; fn returns True once applied."""
+    from sqlalchemy import text
+    engine = db.engines[bind]
+    with engine.begin() as conn:
+        conn.execute(text(SCHEMA_MIGRATIONS_DDL))
+        applied = {row[0] for row in conn.execute(text("SELECT name FROM schema_migrations"))}
+    for name, fn in migrations:
+        if name in applied or not fn():
+            continue
+        with engine.begin() as conn:
+            conn.execute(text("INSERT INTO schema_migrations (name) VALUES (:name)"), {"name": name})
+
 def _ensure_is_active_column():
     try:
         from sqlalchemy import text
@@ -1027,14 +1762,123 @@ def _ensure_is_active_column():
             db.session.execute(text("ALTER TABLE user ADD COLUMN is_active BOOLEAN NOT NULL DEFAULT 1"))
             db.session.commit()
             print("[MIGRATION] Aggiunta colonna is_active alla tabella user (DB: users).")
+        return True
     except Exception as e:
         print("[MIGRATION] Warning:", e)
+        return False
+
+def _ensure_movement_codes():
+    """Add finis_code/full_code to an existing movement table and fill them from item."""
+    try:
+        from sqlalchemy import text
+        engine = db.engines["stock"]
+        names = {c["name"] for c in inspect(engine).get_columns("movement")}
+        if "finis_code" in names:
+            return True
+        with engine.begin() as conn:
+            conn.execute(text("ALTER TABLE movement ADD COLUMN finis_code VARCHAR(64)"))
+            conn.execute(text("ALTER TABLE movement ADD COLUMN full_code VARCHAR(128)"))
+            conn.execute(text(
+                "UPDATE movement SET"
+                " finis_code = (SELECT item.finis_code FROM item WHERE item.id = movement.item_id),"
+                " full_code = (SELECT item.full_code FROM item WHERE item.id = movement.item_id)"))
+        print("[MIGRATION] Aggiunte colonne finis_code/full_code alla tabella movement (DB: stock).")
+        return True
+    except Exception as e:
+        print("[MIGRATION] Warning:", e)
+        return False
+
+def _ensure_indexes():
+    """create_all() skips tables that already exist: add any index they are missing."""
+    try:
+        from sqlalchemy import text
+        engine = db.engines["stock"]
+        for model in (Item, Movement):
+            for index in model.__table__.indexes:
+                index.create(bind=engine, checkfirst=True)
+        with engine.begin() as conn:
+            # superseded by ix_item_updated_at_desc, ix_item_finis_user and ix_movement_item_when
+            for name in ("ix_item_updated_at", "ix_item_finis_code", "ix_movement_item_id"):
+                conn.execute(text(f"DROP INDEX IF EXISTS {name}"))
+    except Exception as e:
+        print("[MIGRATION] Warning:", e)
+
+# External-content FTS5 index over item, kept in sync by triggers. The trigram tokenizer
+# makes MATCH a substring search, i.e. the same semantics as ILIKE '%q%'.
+ITEM_FTS_DDL = (
+    "CREATE VIRTUAL TABLE item_fts USING fts5(finis_code, full_code, description,"
+    " content='item', content_rowid='id', tokenize='trigram')",
+    "CREATE TRIGGER item_fts_ai AFTER INSERT ON item BEGIN"
+    " INSERT INTO item_fts(rowid, finis_code, full_code, description)"
+    " VALUES (new.id, new.finis_code, new.full_code, new.description); END",
+    "CREATE TRIGGER item_fts_ad AFTER DELETE ON item BEGIN"
+    " INSERT INTO item_fts(item_fts, rowid, finis_code, full_code, description)"
+    " VALUES ('delete', old.id, old.finis_code, old.full_code, old.description); END",
+    "CREATE TRIGGER item_fts_au AFTER UPDATE OF finis_code, full_code, description ON item BEGIN"
+    " INSERT INTO item_fts(item_fts, rowid, finis_code, full_code, description)"
+    " VALUES ('delete', old.id, old.finis_code, old.full_code, old.description);"
+    " INSERT INTO item_fts(rowid, finis_code, full_code, description)"
+    " VALUES (new.id, new.finis_code, new.full_code, new.description); END",
+    "INSERT INTO item_fts(item_fts) VALUES ('rebuild')",
+)
+
+def _ensure_item_fts():
+    """Create the item_fts search index on SQLite (FTS5 with trigram); returns whether it is usable."""
+    engine = db.engines["stock"]
+    if engine.dialect.name != "sqlite":
+        return False
+    try:
+        from sqlalchemy import text
+        with engine.begin() as conn:
+            if conn.execute(text("SELECT 1 FROM sqlite_master WHERE name = 'item_fts'")).first():
+                return True
+            for stmt in ITEM_FTS_DDL:
+                conn.execute(text(stmt))
+        print("[MIGRATION] Creato indice di ricerca item_fts (DB: stock).")
+        return True
+    except Exception as e:
+        print("[MIGRATION] Warning: ricerca full-text non disponibile:", e)
+        return False
+
+# Postgres has no item_fts: trigram GIN indexes let the ILIKE '%term%' fallback use an index
+ITEM_TRGM_DDL = (
+    "CREATE EXTENSION IF NOT EXISTS pg_trgm",
+    "CREATE INDEX IF NOT EXISTS ix_item_finis_trgm ON item USING gin (finis_code gin_trgm_ops)",
+    "CREATE INDEX IF NOT EXISTS ix_item_full_code_trgm ON item USING gin (full_code gin_trgm_ops)",
+    "CREATE INDEX IF NOT EXISTS ix_item_description_trgm ON item USING gin (description gin_trgm_ops)",
+)
+
+def _ensure_item_trgm():
+    engine = db.engines["stock"]
+    if engine.dialect.name != "postgresql":
+        return
+    try:
+        from sqlalchemy import text
+        with engine.begin() as conn:
+            for stmt in ITEM_TRGM_DDL:
+                conn.execute(text(stmt))
+    except Exception as e:
+        print("[MIGRATION] Warning: indici trigram non disponibili:", e)
+
+ITEM_FTS_ENABLED = False
 
 with app.app_context():
     db.create_all()
 
-    # ensure is_active column if db already existed
-    _ensure_is_active_column()
+    # columns added after the first release, if db already existed
+    _run_migrations("users", [("user.is_active", _ensure_is_active_column)])
+    _run_migrations("stock", [("movement.finis_code", _ensure_movement_codes)])
+    _ensure_indexes()
+    ITEM_FTS_ENABLED = _ensure_item_fts()
+    _ensure_item_trgm()
+
+    # stock_rollup is new on DBs created before it existed: build it once
+    if db.session.query(StockRollup.user_id).first() is None and db.session.query(Item.id).first() is not None:
+        refresh_stock_rollup()
+        print("[MIGRATION] Popolata tabella stock_rollup (DB: stock).")
+    if db.session.query(MovementDailyStats.day).first() is None and db.session.query(Movement.id).first() is not None:
+        refresh_movement_daily_stats()
+        print("[MIGRATION] Popolata tabella movement_daily_stats (DB: stock).")
 
     if User.query.count() == 0:
         admin_user = os.environ.get("ADMIN_USER")
@@ -1057,4 +1901,5 @@ with app.app_context():
 # ----------------------------------------------------------------------------
 if __name__ == "__main__":
     port = int(os.environ.get("PORT", 5000))
-    app.run(host="0.0.0.0", port=port, debug=True)
+    # Development server only; in production run under gunicorn (see Procfile)
+    app.run(host="0.0.0.0", port=port, debug=os.environ.get("FLASK_DEBUG") == "1")